@@ -0,0 +1,6 @@
+import numpy as np
+
+from fuzzy_truck._table import TABLE_PATH, build_movement_table
+
+if __name__ == '__main__':
+    np.save(TABLE_PATH, build_movement_table())
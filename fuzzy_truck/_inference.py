@@ -0,0 +1,148 @@
+'''
+Mamdani inference compiled with numba, reproducing a scikit-fuzzy
+ControlSystem over the same variables (min/max rules, centroid of the
+piecewise-linear aggregated membership) but working on plain arrays
+'''
+
+import numpy as np
+from numba import njit
+
+
+def automf_params(universe, number: int):
+    '''
+    Triangle vertices of the membership functions created by
+    skfuzzy's `automf` over the given universe
+
+    Parameters
+    ----------
+    universe : np.ndarray
+        Universe of the fuzzy variable
+    number : int
+        Number of membership functions
+
+    Returns
+    ----------
+    C-contiguous float32 array of shape (number, 3) with the (a, b, c)
+    vertices of each triangle
+    '''
+    low, high = universe.min(), universe.max()
+    half_width = (high - low) / (number - 1)
+    centers = np.linspace(low, high, number)
+
+    return np.ascontiguousarray(
+        np.stack([centers - half_width, centers, centers + half_width],
+                 axis=1),
+        dtype=np.float32)
+
+
+@njit(cache=True, fastmath=True)
+def _trimf(value, a, b, c):
+    '''
+    Membership of value in the triangle (a, b, c)
+    '''
+    if value <= a or value >= c:
+        return 0.0
+    if value <= b:
+        return (value - a) / (b - a)
+    return (c - value) / (c - b)
+
+
+@njit(cache=True, fastmath=True)
+def _partition(value, mf_params):
+    '''
+    Locate value in an evenly spaced triangular partition, where only
+    two neighbouring terms can be non-zero
+
+    Returns
+    ----------
+    (i, weight) where term i has membership 1 - weight and
+    term i + 1 has membership weight
+    '''
+    last = mf_params.shape[0] - 1
+    spacing = mf_params[1, 1] - mf_params[0, 1]
+
+    position = min(max((value - mf_params[0, 1]) / spacing, 0.0), last)
+    i = min(int(position), last - 1)
+
+    return i, position - i
+
+
+# Explicit signature compiles at import (or loads from cache) instead of
+# on the first call
+@njit('f8(f8, f8, f4[:, ::1], f4[:, ::1], f4[:, ::1], i1[:, ::1], f8[::1])',
+      cache=True, fastmath=True)
+def infer(x, angle, mf_x_params, mf_a_params, mf_out_params, rule_table,
+          out_universe):
+    '''
+    Compute the defuzzified movement for one input sample
+
+    Parameters
+    ----------
+    x : float
+        x position in [0, 10]
+    angle : float
+        Truck angle in [0, 180]
+    mf_x_params, mf_a_params, mf_out_params : np.ndarray
+        Triangle vertices of x, angle and movement membership functions,
+        as returned by automf_params
+    rule_table : np.ndarray
+        Index of the movement term fired by each (x term, angle term) pair
+    out_universe : np.ndarray
+        Universe of the movement variable, as contiguous float64
+
+    Returns
+    ----------
+    Centroid of the aggregated movement membership, linearly
+    interpolated between the universe and activation cut points
+    '''
+    i, x_weight = _partition(x, mf_x_params)
+    j, a_weight = _partition(angle, mf_a_params)
+    mu_x = (1.0 - x_weight, x_weight)
+    mu_a = (1.0 - a_weight, a_weight)
+
+    # Only the 4 rules around (i, j) can fire. Rule strength is the min
+    # of its antecedents, terms fired by several rules keep the strongest
+    activation = np.zeros(mf_out_params.shape[0], dtype=np.float32)
+    for di in range(2):
+        for dj in range(2):
+            k = rule_table[i + di, j + dj]
+            activation[k] = max(activation[k], min(mu_x[di], mu_a[dj]))
+
+    # Like skfuzzy, sample the aggregated membership at the universe and
+    # at the points where each fired term crosses its activation level
+    n_out = out_universe.shape[0]
+    points = np.empty(n_out + 2 * activation.shape[0])
+    points[:n_out] = out_universe
+    n_points = n_out
+    for k in range(activation.shape[0]):
+        cut = activation[k]
+        if cut == 0.0:
+            continue
+        a, b, c = mf_out_params[k, 0], mf_out_params[k, 1], mf_out_params[k, 2]
+        for point in (a + cut * (b - a), c - cut * (c - b)):
+            if out_universe[0] <= point <= out_universe[n_out - 1]:
+                points[n_points] = point
+                n_points += 1
+    points = np.sort(points[:n_points])
+
+    # Clip each fired term at its activation and aggregate with max
+    aggregated = np.zeros(n_points)
+    for k in range(activation.shape[0]):
+        if activation[k] == 0.0:
+            continue
+        for n in range(n_points):
+            mu = min(activation[k], _trimf(points[n],
+                                           mf_out_params[k, 0],
+                                           mf_out_params[k, 1],
+                                           mf_out_params[k, 2]))
+            aggregated[n] = max(aggregated[n], mu)
+
+    # Centroid of the piecewise-linear membership through those points,
+    # integrated segment by segment as skfuzzy's centroid does
+    widths = points[1:] - points[:-1]
+    left, right = aggregated[:-1], aggregated[1:]
+    area = np.dot(widths, left + right) / 2
+    moment = np.dot(widths, points[:-1] * (2 * left + right) +
+                    points[1:] * (left + 2 * right)) / 6
+
+    return moment / area
@@ -0,0 +1,102 @@
+'''
+Offline generation of the movement table read by Driver. Only this
+module depends on scikit-fuzzy and numba, run `build_table.py` after
+changing variables or rules
+'''
+
+import numpy as np
+from skfuzzy import control as ctrl
+
+from ._inference import automf_params, infer
+from .driver import _TABLE_FULL_SCALE, _TABLE_PATH as TABLE_PATH
+
+# Movement is stored as int8, mapping [-30, 30] onto
+# [-_TABLE_FULL_SCALE, _TABLE_FULL_SCALE]
+TABLE_SCALE = _TABLE_FULL_SCALE / 30
+
+# Rows are x terms, columns are angle terms (large_below_90, ...,
+# large_above_90) and values index the movement term (0 = NB, ..., 6 = PB)
+CONSEQUENT = np.array([
+    [6,    6,    6,    5,    5,    4,    2],  # Left Big
+    [6,    6,    5,    5,    4,    2,    1],  # Left Medium
+    [5,    5,    5,    3,    1,    1,    1],  # Centered
+    [5,    4,    2,    1,    1,    0,    0],  # Right Medium
+    [4,    2,    1,    1,    0,    0,    0],  # Right Big
+], dtype=np.int8)
+
+
+def fuzzy_variables():
+    '''
+    Configure the fuzzy logic variables
+
+    Returns
+    ----------
+    (x, angle, movement) skfuzzy variables
+    '''
+
+    x = ctrl.Antecedent(np.arange(0, 11, 1), 'x_position')
+    angle = ctrl.Antecedent(np.arange(0, 180, 1), 'truck_angle')
+
+    movement = ctrl.Consequent(np.arange(-30, 31, 1), 'movement')
+
+    angle.automf(7,
+                names=[
+                 'large_below_90',
+                 'medium_below_90',
+                 'small_below_90',
+                 'at_90',
+                 'small_above_90',
+                 'medium_above_90',
+                 'large_above_90',
+                ])
+
+    x.automf(5,
+            names=[
+                'left_big',
+                'left_medium',
+                'centered',
+                'right_medium',
+                'right_big',
+            ])
+
+    movement.automf(7,
+                   names=[
+                    'NB', # negative big change',
+                    'NM', # negative medium change',
+                    'NS', # negative small change',
+                    'ZE', # zero (no change)',
+                    'PS', # positive small change',
+                    'PM', # positive medium change',
+                    'PB', # positive big change',
+                   ])
+
+    return x, angle, movement
+
+
+def build_movement_table():
+    '''
+    Evaluate the fuzzy controller once for every point of the
+    discretized input domain
+
+    Returns
+    ----------
+    Array of shape (len(x universe), len(angle universe)) with the
+    defuzzified movement quantized by TABLE_SCALE
+    '''
+    x, angle, movement = fuzzy_variables()
+
+    mf_x = automf_params(x.universe, len(x.terms))
+    mf_angle = automf_params(angle.universe, len(angle.terms))
+    mf_movement = automf_params(movement.universe, len(movement.terms))
+    out_universe = movement.universe.astype(np.float64)
+
+    table = np.empty((len(x.universe), len(angle.universe)),
+                     dtype=np.float32)
+
+    for i, x_value in enumerate(x.universe):
+        for j, angle_value in enumerate(angle.universe):
+            table[i, j] = infer(float(x_value), float(angle_value),
+                                mf_x, mf_angle, mf_movement, CONSEQUENT,
+                                out_universe)
+
+    return np.round(table * TABLE_SCALE).astype(np.int8)
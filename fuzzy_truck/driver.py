@@ -1,17 +1,79 @@
+import os
 import socket
 
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
 from loguru import logger
 
+_TABLE_PATH = os.path.join(os.path.dirname(__file__), 'movement_lut.npy')
+
+# Table value standing for the maximum movement, shared with _table
+_TABLE_FULL_SCALE = 127
+
+
+_CACHE_LINE = 64
+
+_POSITION_REQUEST = b'r\r\n'
+
+
+def _layout_table(table):
+    '''
+    Copy table into a row-major array aligned to cache lines, with each
+    row padded to a whole number of cache lines. The padding repeats the
+    last row and column, so interpolation never needs to clamp the
+    upper neighbour index
+    '''
+    rows, cols = table.shape
+    line = _CACHE_LINE // table.itemsize
+    padded_cols = -(-(cols + 1) // line) * line
+
+    buffer = np.empty((rows + 1) * padded_cols * table.itemsize + _CACHE_LINE,
+                      dtype=np.uint8)
+    offset = -buffer.ctypes.data % _CACHE_LINE
+    layout = buffer[offset:offset + (rows + 1) * padded_cols * table.itemsize]
+    layout = layout.view(table.dtype).reshape(rows + 1, padded_cols)
+
+    layout[:rows, :cols] = table
+    layout[:rows, cols:] = table[:, -1:]
+    layout[rows] = layout[rows - 1]
+
+    return layout
+
+
+def _bilinear(table, row: float, col: float, max_row: int, max_col: int):
+    '''
+    Bilinear interpolation of a table built by _layout_table at a
+    fractional position, clamped to [0, max_row] x [0, max_col]
+    '''
+    row = min(max(row, 0), max_row)
+    col = min(max(col, 0), max_col)
+    r0 = int(row)
+    c0 = int(col)
+    dr = row - r0
+    dc = col - c0
+
+    # item() returns Python scalars, avoiding int8 overflow and the cost
+    # of NumPy scalar arithmetic
+    top_left = table.item(r0, c0)
+    top_right = table.item(r0, c0 + 1)
+    bottom_left = table.item(r0 + 1, c0)
+    bottom_right = table.item(r0 + 1, c0 + 1)
+
+    top = top_left + (top_right - top_left) * dc
+    bottom = bottom_left + (bottom_right - bottom_left) * dc
+
+    return top + (bottom - top) * dr
+
 class Driver:
     '''
         Driver for interpreting signals from application and process the
         next movement
     '''
 
-    def __init__(self, host: str, port: int):
+    # Address that accepted the connection for each hostname
+    _resolved_hosts = {}
+
+    def __init__(self, host: str, port: int, cpu: int = None,
+                 debug: bool = False):
         '''
         Parameters 
         
@@ -20,137 +82,95 @@ class Driver:
             Hostname where application is listening
         port : int
             Port where host will be listning
+        cpu : int, optional
+            CPU to pin the whole process to (not only this connection),
+            ideally the one handling the network queue of the
+            connection. Only supported where os.sched_setaffinity
+            exists, elsewhere a warning is logged
+        debug : bool, optional
+            Raise on out of range movements instead of clamping them
         '''
         
         self.host = host
         self.port = port
-        
-        self._client = socket.socket(socket.AF_INET, 
-                                    socket.SOCK_STREAM)
-        ip = socket.gethostbyname(host)
-        address = (ip, port)
+
+        # host and port are bound into record["extra"] for custom sinks.
+        # Lazy: message arguments must be callables, only evaluated when
+        # the message is actually emitted
+        self._logger = logger.bind(host=host, port=port).opt(lazy=True)
         
         try:
-            self._client.connect(address)
-        except ConnectionRefusedError:
-            logger.error('Failed to connect to application. Restart simulation.')
+            self._client = self._connect(host, port)
+        except OSError:
+            self._logger.error('Failed to connect to application. Restart simulation.')
             raise
 
+        self._client.settimeout(None)
+
+        # Commands are tiny and answered one by one, so Nagle's algorithm
+        # would only delay them
+        self._client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._client.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self._rfile = self._client.makefile('rb', buffering=4096)
+
+        if cpu is not None:
+            if hasattr(os, 'sched_setaffinity'):
+                os.sched_setaffinity(0, {cpu})
+            else:
+                self._logger.warning('CPU pinning is not supported on this '
+                                     'platform, ignoring cpu={}', lambda: cpu)
+
+        # play() requests the next position as soon as it sends a movement
+        self._awaiting_position = False
+
         self.upper_limit = 1
         self.lower_limit = -1
+        self.debug = debug
+
+        # Encoded commands for every movement in steps of 0.01, indexed
+        # by movement * 100. Limits changed later fall back to encoding
+        self._commands = {
+            step: f'{step / 100:.2f}\r\n'.encode()
+            for step in range(round(self.lower_limit * 100),
+                              round(self.upper_limit * 100) + 1)
+        }
         
-        self._setup_fuzzy_variables()
-        self._setup_fuzzy_rules()
-        self._setup_fuzzy_controller()
+        # Generated by build_table.py, so running the driver needs
+        # neither scikit-fuzzy nor numba. Values are int8, where
+        # _TABLE_FULL_SCALE stands for the maximum movement
+        table = np.load(_TABLE_PATH)
+        self._max_x, self._max_angle = table.shape[0] - 1, table.shape[1] - 1
+        self._lut = _layout_table(table)
         
         self.done = False
     
-    def _setup_fuzzy_variables(self):
+    @classmethod
+    def _connect(cls, host: str, port: int):
         '''
-        Configure the fuzzy logic, variables on object to be used
-        by _setup_fuzzy_rules and _setup_fuzzy_controller
+        Open connection to application. create_connection tries every
+        IPv4/IPv6 address of host, the one that answers is reused by
+        later drivers to skip the lookup. A cached address that stopped
+        answering is dropped and host is resolved again
         '''
-        
-        self.x = ctrl.Antecedent(np.arange(0, 11, 1), 'x_position')
-        self.angle = ctrl.Antecedent(np.arange(0, 180, 1), 'truck_angle')
-
-        self.movement = ctrl.Consequent(np.arange(-30, 31, 1), 'movement')
-
-        self.angle.automf(7, 
-                    names=[
-                     'large_below_90',
-                     'medium_below_90',
-                     'small_below_90',
-                     'at_90',
-                     'small_above_90',
-                     'medium_above_90',
-                     'large_above_90',
-                    ])
-
-        self.x.automf(5,
-                names=[
-                    'left_big',
-                    'left_medium',
-                    'centered',
-                    'right_medium',
-                    'right_big',
-                ])
-
-        self.movement.automf(7, 
-                       names=[
-                        'NB', # negative big change',
-                        'NM', # negative medium change',
-                        'NS', # negative small change',
-                        'ZE', # zero (no change)',
-                        'PS', # positive small change',
-                        'PM', # positive medium change',
-                        'PB', # positive big change',
-                       ])
-
-    def _setup_fuzzy_rules(self):
-        '''
-        Setup fuzzy rules, rules inserted  on object
-        to be used by _setup_fuzzy_controller
-        '''
-        self._rules = [
-            # Left Big
-            ctrl.Rule(self.angle['large_below_90'] & self.x['left_big'], self.movement['PB']),
-            ctrl.Rule(self.angle['medium_below_90'] & self.x['left_big'], self.movement['PB']),
-            ctrl.Rule(self.angle['small_below_90'] & self.x['left_big'], self.movement['PB']),
-            ctrl.Rule(self.angle['at_90'] & self.x['left_big'], self.movement['PM']),
-            ctrl.Rule(self.angle['small_above_90'] & self.x['left_big'], self.movement['PM']),
-            ctrl.Rule(self.angle['medium_above_90'] & self.x['left_big'], self.movement['PS']),
-            ctrl.Rule(self.angle['large_above_90'] & self.x['left_big'], self.movement['NS']),
-            
-            # Left Medium
-            ctrl.Rule(self.angle['large_below_90'] & self.x['left_medium'], self.movement['PB']),
-            ctrl.Rule(self.angle['medium_below_90'] & self.x['left_medium'], self.movement['PB']),
-            ctrl.Rule(self.angle['small_below_90'] & self.x['left_medium'], self.movement['PM']),
-            ctrl.Rule(self.angle['at_90'] & self.x['left_medium'], self.movement['PM']),
-            ctrl.Rule(self.angle['small_above_90'] & self.x['left_medium'], self.movement['PS']),
-            ctrl.Rule(self.angle['medium_above_90'] & self.x['left_medium'], self.movement['NS']),
-            ctrl.Rule(self.angle['large_above_90'] & self.x['left_medium'], self.movement['NM']),
-
-            # Centered
-            ctrl.Rule(self.angle['large_below_90'] & self.x['centered'], self.movement['PM']),
-            ctrl.Rule(self.angle['medium_below_90'] & self.x['centered'], self.movement['PM']),
-            ctrl.Rule(self.angle['small_below_90'] & self.x['centered'], self.movement['PM']),
-            ctrl.Rule(self.angle['at_90'] & self.x['centered'], self.movement['ZE']), # Obvious
-            ctrl.Rule(self.angle['small_above_90'] & self.x['centered'], self.movement['NM']),
-            ctrl.Rule(self.angle['medium_above_90'] & self.x['centered'], self.movement['NM']),
-            ctrl.Rule(self.angle['large_above_90'] & self.x['centered'], self.movement['NM']),
-
-            # Right Medium
-            ctrl.Rule(self.angle['large_below_90'] & self.x['right_medium'], self.movement['PM']),
-            ctrl.Rule(self.angle['medium_below_90'] & self.x['right_medium'], self.movement['PS']),
-            ctrl.Rule(self.angle['small_below_90'] & self.x['right_medium'], self.movement['NS']),
-            ctrl.Rule(self.angle['at_90'] & self.x['right_medium'], self.movement['NM']),
-            ctrl.Rule(self.angle['small_above_90'] & self.x['right_medium'], self.movement['NM']),
-            ctrl.Rule(self.angle['medium_above_90'] & self.x['right_medium'], self.movement['NB']),
-            ctrl.Rule(self.angle['large_above_90'] & self.x['right_medium'], self.movement['NB']),
-
-            # Right Big
-            ctrl.Rule(self.angle['large_below_90'] & self.x['right_big'], self.movement['PS']),
-            ctrl.Rule(self.angle['medium_below_90'] & self.x['right_big'], self.movement['NS']),
-            ctrl.Rule(self.angle['small_below_90'] & self.x['right_big'], self.movement['NM']),
-            ctrl.Rule(self.angle['at_90'] & self.x['right_big'], self.movement['NM']),
-            ctrl.Rule(self.angle['small_above_90'] & self.x['right_big'], self.movement['NB']),
-            ctrl.Rule(self.angle['medium_above_90'] & self.x['right_big'], self.movement['NB']),
-            ctrl.Rule(self.angle['large_above_90'] & self.x['right_big'], self.movement['NB']),
-        ]
-        
-    def _setup_fuzzy_controller(self):
-        '''
-        Setup fuzzy controler with rules and inputs
-        
-        '''
-        self._controller = ctrl.ControlSystem(self._rules)
-        self.simulator = ctrl.ControlSystemSimulation(self._controller)
-        
-        
+        cached = cls._resolved_hosts.get(host)
+
+        try:
+            client = socket.create_connection((cached or host, port),
+                                              timeout=2.0)
+        except OSError:
+            if cached is None:
+                raise
+            cls._resolved_hosts.pop(host, None)
+            client = socket.create_connection((host, port), timeout=2.0)
+
+        cls._resolved_hosts[host] = client.getpeername()[0]
+        return client
+
     def get_position_and_angle(self):
         '''
-        Send message to application asking for the position of truck
+        Read the position of truck from application, asking for it
+        first unless play() already requested it along with the last
+        movement
         
         Returns
         ----------
@@ -163,14 +183,18 @@ class Driver:
         if self.done:
             return
 
-        self._client.send(b'r\r\n')
-        ret = self._client.recv(1024)
+        if not self._awaiting_position:
+            self._client.sendall(_POSITION_REQUEST)
+        self._awaiting_position = False
+
+        ret = self._rfile.readline()
         if not ret:
-            logger.info('Simulation finished.')
+            self._logger.info('Simulation finished.')
             self.done = True
             return
             
-        x, y, angle = ret.decode().split('\t')
+        # float() parses bytes directly, no need to decode the line
+        x, y, angle = ret.split(b'\t')
         
         return (float(x), float(y), float(angle))
     
@@ -183,28 +207,55 @@ class Driver:
         value: float
             Value between self.lower_limit and self.upper_limit,
             that represents the maximum and minimum rotation on
-            truck's steering wheel
+            truck's steering wheel, sent with 0.01 precision. Values
+            out of range are clamped, or rejected when debug is set
         '''
 
-        if value < self.lower_limit or value > self.upper_limit:
+        self._client.sendall(self._movement_command(value))
+
+    def _movement_command(self, value: float):
+        '''
+        Encode movement command to be sent to application,
+        see make_movement
+        '''
+
+        if self.debug and not self.lower_limit <= value <= self.upper_limit:
             raise ValueError(f'Invalid movement. Value musts be ' +
                              f'in [{self.upper_limit}, {self.lower_limit}]')
-        self._client.send(f'{value}\r\n'.encode())
+
+        value = min(self.upper_limit, max(self.lower_limit, value))
+
+        command = self._commands.get(round(value * 100))
+        if command is None:
+            command = f'{value:.2f}\r\n'.encode()
+        return command
+
+    def close(self):
+        '''
+        Close connection to application
+        '''
+
+        self._rfile.close()
+        self._client.close()
         
     def play(self):
         '''
         Request position and compute next movement
         '''
+        # Runs every tick: do not log here, a loguru call (frame lookup,
+        # record building) costs more than the rest of the tick
         ret = self.get_position_and_angle()
         if self.done:
             return
 
         x, y, angle = ret
 
-        self.simulator.input['truck_angle'] = angle
-        self.simulator.input['x_position'] = x * 10
-
-        self.simulator.compute()
+        movement = _bilinear(self._lut, x * 10, angle,
+                             self._max_x, self._max_angle) / _TABLE_FULL_SCALE
 
-        self.make_movement(self.simulator.output['movement']/30)
+        # Request the next position along with the movement, so its round
+        # trip overlaps with whatever runs until the next play()
+        self._client.sendall(self._movement_command(movement) +
+                             _POSITION_REQUEST)
+        self._awaiting_position = True
         
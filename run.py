@@ -4,4 +4,6 @@ if __name__ == '__main__':
     driver = Driver('127.0.0.1', 4321)
 
     for i in range(50):
-        driver.play()
\ No newline at end of file
+        driver.play()
+
+    driver.close()
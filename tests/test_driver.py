@@ -0,0 +1,199 @@
+import os
+import socket
+
+import numpy as np
+import pytest
+from loguru import logger
+
+from fuzzy_truck import Driver
+from fuzzy_truck.driver import _TABLE_FULL_SCALE, _TABLE_PATH, _bilinear, _layout_table
+
+
+@pytest.fixture
+def server():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    yield listener
+    listener.close()
+
+
+@pytest.fixture
+def connection(server):
+    '''
+    (driver, application side socket) connected to each other
+    '''
+    driver = Driver('127.0.0.1', server.getsockname()[1])
+    conn, _ = server.accept()
+    conn.settimeout(1)
+    yield driver, conn
+    conn.close()
+    driver.close()
+
+
+def receive(conn, size):
+    data = b''
+    while len(data) < size:
+        data += conn.recv(size - len(data))
+    return data
+
+
+def assert_nothing_received(conn):
+    conn.settimeout(0.1)
+    with pytest.raises(socket.timeout):
+        conn.recv(1)
+    conn.settimeout(1)
+
+
+@pytest.fixture
+def table():
+    return np.load(_TABLE_PATH)
+
+
+@pytest.fixture
+def lut(table):
+    return _layout_table(table)
+
+
+def test_bilinear_on_grid_points(table, lut):
+    max_row, max_col = table.shape[0] - 1, table.shape[1] - 1
+
+    for row in range(table.shape[0]):
+        for col in range(table.shape[1]):
+            assert _bilinear(lut, row, col, max_row, max_col) == table[row, col]
+
+
+def test_bilinear_between_grid_points(table, lut):
+    max_row, max_col = table.shape[0] - 1, table.shape[1] - 1
+    corners = table[4:6, 90:92].astype(float)
+
+    assert _bilinear(lut, 4.5, 90.5, max_row, max_col) == pytest.approx(corners.mean())
+    assert _bilinear(lut, 4.25, 90, max_row, max_col) == pytest.approx(
+        0.75 * corners[0, 0] + 0.25 * corners[1, 0])
+    assert _bilinear(lut, 4, 90.75, max_row, max_col) == pytest.approx(
+        0.25 * corners[0, 0] + 0.75 * corners[0, 1])
+
+
+@pytest.mark.parametrize('row, col, expected', [
+    (12.5, 90, (10, 90)),
+    (3, 179, (3, 179)),
+    (3, 179.5, (3, 179)),
+    (3, 180, (3, 179)),
+    (-1, 90, (0, 90)),
+    (3, -20, (3, 0)),
+    (-1, -1, (0, 0)),
+    (11, 200, (10, 179)),
+])
+def test_bilinear_clamps_inputs(table, lut, row, col, expected):
+    max_row, max_col = table.shape[0] - 1, table.shape[1] - 1
+
+    assert _bilinear(lut, row, col, max_row, max_col) == table[expected]
+
+
+def test_layout_table_is_cache_line_aligned(lut):
+    assert lut.ctypes.data % 64 == 0
+    assert lut.flags['C_CONTIGUOUS']
+
+
+def test_layout_table_pads_rows_to_cache_lines(table, lut):
+    assert lut.shape == (table.shape[0] + 1, 192)
+    assert lut.strides == (192, 1)
+    assert (lut[:table.shape[0], :table.shape[1]] == table).all()
+
+
+def test_layout_table_repeats_last_row_and_column(table, lut):
+    rows, cols = table.shape
+
+    assert (lut[:rows, cols:] == table[:, -1:]).all()
+    assert (lut[rows] == lut[rows - 1]).all()
+
+
+def test_play_pipelines_position_requests(connection, table):
+    driver, conn = connection
+    request = b'r\r\n'
+
+    conn.sendall(b'0.5\t0.5\t90\r\n')
+    driver.play()
+    first = driver._commands[round(table[5, 90] / _TABLE_FULL_SCALE * 100)]
+    assert receive(conn, len(request + first + request)) == request + first + request
+    assert_nothing_received(conn)
+
+    conn.sendall(b'0.2\t0.5\t45\r\n')
+    driver.play()
+    second = driver._commands[round(table[2, 45] / _TABLE_FULL_SCALE * 100)]
+    assert receive(conn, len(second + request)) == second + request
+    assert_nothing_received(conn)
+
+
+def test_play_sets_done_on_end_of_simulation(connection):
+    driver, conn = connection
+
+    conn.shutdown(socket.SHUT_WR)
+    driver.play()
+
+    assert driver.done
+    assert driver.get_position_and_angle() is None
+
+
+def test_stale_resolved_address_is_dropped(server, monkeypatch):
+    # Nothing listens on 127.0.0.2, as if the application moved
+    monkeypatch.setitem(Driver._resolved_hosts, 'localhost', '127.0.0.2')
+
+    driver = Driver('localhost', server.getsockname()[1])
+    server.accept()[0].close()
+    driver.close()
+
+    assert Driver._resolved_hosts['localhost'] == '127.0.0.1'
+
+
+@pytest.mark.parametrize('value, expected', [
+    (-1, b'-1.00\r\n'),
+    (0, b'0.00\r\n'),
+    (0.07, b'0.07\r\n'),
+    (0.4249, b'0.42\r\n'),
+    (1, b'1.00\r\n'),
+])
+def test_movement_command_encoding(connection, value, expected):
+    driver, _ = connection
+
+    assert driver._movement_command(value) == expected
+
+
+def test_movement_command_clamps_out_of_range(connection):
+    driver, _ = connection
+
+    assert driver._movement_command(1.5) == b'1.00\r\n'
+    assert driver._movement_command(-3) == b'-1.00\r\n'
+
+
+def test_movement_command_follows_changed_limits(connection):
+    driver, _ = connection
+    driver.upper_limit = 2
+
+    assert driver._movement_command(1.5) == b'1.50\r\n'
+    assert driver._movement_command(3) == b'2.00\r\n'
+
+
+def test_movement_command_raises_in_debug(connection):
+    driver, _ = connection
+    driver.debug = True
+
+    with pytest.raises(ValueError):
+        driver._movement_command(1.01)
+    assert driver._movement_command(0.5) == b'0.50\r\n'
+
+
+def test_cpu_pinning_unavailable_is_logged(server, monkeypatch):
+    monkeypatch.delattr(os, 'sched_setaffinity', raising=False)
+    messages = []
+    handler = logger.add(messages.append, level='WARNING')
+
+    try:
+        driver = Driver('127.0.0.1', server.getsockname()[1], cpu=0)
+        server.accept()[0].close()
+        driver.close()
+    finally:
+        logger.remove(handler)
+
+    assert len(messages) == 1
+    assert 'cpu=0' in messages[0]
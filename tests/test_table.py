@@ -0,0 +1,30 @@
+import numpy as np
+from skfuzzy import control as ctrl
+
+from fuzzy_truck._table import CONSEQUENT, TABLE_SCALE, build_movement_table, fuzzy_variables
+
+
+def test_movement_table_matches_skfuzzy():
+    x, angle, movement = fuzzy_variables()
+    x_terms, angle_terms, movement_terms = (list(x.terms), list(angle.terms),
+                                            list(movement.terms))
+
+    rules = [
+        ctrl.Rule(x[x_terms[i]] & angle[angle_terms[j]],
+                  movement[movement_terms[CONSEQUENT[i, j]]])
+        for i in range(len(x_terms))
+        for j in range(len(angle_terms))
+    ]
+    simulator = ctrl.ControlSystemSimulation(ctrl.ControlSystem(rules))
+
+    table = build_movement_table()
+
+    # Every x and a subset of angles, skfuzzy is slow
+    for i in x.universe:
+        for j in list(angle.universe[::5]) + [angle.universe[-1]]:
+            simulator.input['x_position'] = i
+            simulator.input['truck_angle'] = j
+            simulator.compute()
+
+            expected = simulator.output['movement']
+            assert abs(table[i, j] / TABLE_SCALE - expected) <= 0.5 / TABLE_SCALE + 1e-3